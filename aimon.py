@@ -1,11 +1,37 @@
 # aimonitor.py
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import json
 import time
 import sys
+import socket
+import sqlite3
+import hashlib
+import heapq
+import itertools
+import functools
 import psutil
 
+# Optional fast JSON codec; falls back to the stdlib json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional dependencies for the semantic prompt cache. If they are missing
+# the monitor still works, it just calls the AI on every tick.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
 class Groq:
     def __init__(self, api_key):
         if not api_key:
@@ -14,6 +40,35 @@ class Groq:
         # Use the correct Groq API base URL as provided in the original code
         self.base_url = "https://api.groq.com/openai/v1"
 
+        # Reuse a single session with keep-alive pooling so repeated calls
+        # (e.g. from the background monitor) skip the TCP+TLS handshake
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+        # allowed_methods must include POST explicitly: urllib3's default set
+        # excludes it, which would make the status_forcelist dead config for
+        # this client's only request type. Retry-After on 429 is honored by
+        # urllib3 by default.
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=frozenset({"POST"}))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        """
+        Close the underlying HTTP session and its pooled connections.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def chat_completions(self, messages, model, temperature=1, max_completion_tokens=1024, top_p=1, stream=False, stop=None):
         """
         Makes a POST request to the Groq API for chat completions, with support for streaming responses.
@@ -27,10 +82,6 @@ class Groq:
          The API response (dict) if not streaming, or a generator if streaming.
         """
         url = f"{self.base_url}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
         data = {
             "messages": messages,
             "model": model,
@@ -42,12 +93,20 @@ class Groq:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=data, stream=stream)
+            if orjson is not None:
+                # orjson's C encoder is much faster than the stdlib json that
+                # requests uses for the json= parameter; the session already
+                # sends Content-Type: application/json
+                response = self.session.post(url, data=orjson.dumps(data), stream=stream, timeout=(5, 60))
+            else:
+                response = self.session.post(url, json=data, stream=stream, timeout=(5, 60))
             response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
 
             if stream:
                 # Return the generator for streaming responses
                 return response.iter_lines(decode_unicode=True)
+            elif orjson is not None:
+                return orjson.loads(response.content)
             else:
                 # Return the JSON response for non-streaming
                 return response.json()
@@ -61,82 +120,469 @@ class Groq:
                  error_message = str(e)
             raise Exception(f"Groq API Error: {error_message}")
 
+class SemanticCache:
+    """
+    In-memory semantic cache mapping an embedding of the system snapshot to
+    previously returned AI advice. Near-identical snapshots (cosine similarity
+    above the threshold) reuse the cached advice instead of paying a full
+    network + inference round-trip.
+    Entries are namespaced by hostname and expire after ttl seconds.
+    """
+    def __init__(self, ttl=1800, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+        self.ttl = ttl
+        self.namespace = socket.gethostname()
+        self._model_name = model_name
+        self._model = None
+        self._embeddings = None  # float32 ndarray, one row per entry
+        self._entries = []       # list of (namespace, timestamp, advice)
+        self._disabled = False   # set when model load/encode fails
+
+    @property
+    def available(self):
+        """
+        True if the optional embedding dependencies are installed and the
+        embedding model has not failed.
+        """
+        return (not self._disabled
+                and np is not None and SentenceTransformer is not None)
+
+    def embed(self, text):
+        """
+        Returns a normalized float32 embedding of the text, or None if the
+        embedding model is unavailable. A model that fails to load or encode
+        (e.g. no network to fetch it) disables the cache instead of raising,
+        so analysis degrades to the uncached path.
+        """
+        if not self.available:
+            return None
+        try:
+            if self._model is None:
+                # Load the local embedding model lazily; it is only needed once
+                self._model = SentenceTransformer(self._model_name)
+            emb = self._model.encode(text, normalize_embeddings=True)
+            return np.asarray(emb, dtype=np.float32)
+        except Exception as e:
+            print(f"Semantic cache disabled, embedding failed: {e}")
+            self._disabled = True
+            return None
+
+    def _evict_expired(self):
+        if not self._entries:
+            return
+        cutoff = time.time() - self.ttl
+        keep = [i for i, (_, ts, _) in enumerate(self._entries) if ts >= cutoff]
+        if len(keep) != len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._embeddings = self._embeddings[keep] if keep else None
+
+    def get(self, emb, threshold=0.92):
+        """
+        Returns cached advice for the most similar entry above the threshold,
+        or None on a miss.
+        """
+        if emb is None or self._embeddings is None:
+            return None
+        self._evict_expired()
+        if self._embeddings is None or not len(self._entries):
+            return None
+        # Embeddings are normalized, so cosine similarity is a dot product
+        sims = self._embeddings @ emb
+        best = int(np.argmax(sims))
+        namespace, _, advice = self._entries[best]
+        if namespace == self.namespace and sims[best] >= threshold:
+            return advice
+        return None
+
+    def set(self, emb, advice):
+        """
+        Stores advice under the given embedding.
+        """
+        if emb is None:
+            return
+        row = emb.reshape(1, -1)
+        if self._embeddings is None:
+            self._embeddings = row
+        else:
+            self._embeddings = np.vstack([self._embeddings, row])
+        self._entries.append((self.namespace, time.time(), advice))
+
+
+# Shared cache instance for analyze_system_data
+_semantic_cache = SemanticCache()
+
+
+def _snapshot_features(system_info, processes):
+    """
+    Builds a compact, low-entropy feature string from a system snapshot for
+    semantic caching: CPU/memory bucketed to 5%, plus the sorted names of the
+    top 10 CPU-consuming processes.
+    """
+    cpu_bucket = round((system_info.get("cpu_percent") or 0) / 5) * 5
+    mem_bucket = round((system_info.get("memory_percent") or 0) / 5) * 5
+    top_names = sorted(
+        p.get('name') or ''
+        for p in heapq.nlargest(10, processes, key=lambda p: p.get('cpu_percent') or 0)
+    )
+    return f"cpu={cpu_bucket} mem={mem_bucket} procs={','.join(top_names)}"
+
+
+# Static analysis instructions kept in a separate system message. Keeping
+# this prefix byte-identical across requests lets Groq's server-side prompt
+# cache skip prefill for it; only the dynamic data in the user message varies.
+_SYSTEM_PROMPT = (
+    "You are a system monitoring assistant. You will be given system metrics "
+    "and a list of running processes. Identify any potential issues (high "
+    "resource usage, unusual processes, potential malicious indicators, "
+    "congestion or overload) and provide concise, actionable advice. If "
+    "everything looks normal, state that."
+)
+
+# Clients registered here so the cached completion helper can look them up
+# by API key without making the client part of the cache key
+_clients_by_key = {}
+
 # Function to initialize the Groq client
 def initialize_client(api_key):
     """
     Initialize and return the Groq client.
     """
-    return Groq(api_key)
+    client = Groq(api_key)
+    _clients_by_key[client.api_key] = client
+    return client
+
+def _log_usage(response_json):
+    """
+    Logs prompt token usage and server-side prompt-cache hits when reported.
+    """
+    usage = response_json.get("usage") or {}
+    if usage:
+        cached = (response_json.get("x_groq") or {}).get("usage", {}).get("cached_tokens", 0)
+        print(f"[usage] prompt_tokens={usage.get('prompt_tokens', 'N/A')}, cached_tokens={cached}")
+
+def _extract_content(response_json):
+    """
+    Extracts the message content from a non-streaming chat completion response.
+    """
+    try:
+        return response_json["choices"][0]["message"]["content"]
+    except (KeyError, IndexError):
+        # Print the unexpected response structure for debugging
+        print("Unexpected response structure from Groq API:")
+        if orjson is not None:
+            print(orjson.dumps(response_json, option=orjson.OPT_INDENT_2).decode())
+        else:
+            print(json.dumps(response_json, indent=2))
+        raise Exception("Malformed response from Groq API")
+
+class AdviceStore:
+    """
+    Persistent on-disk cache of AI advice keyed by prompt hash, so a
+    restarted monitor can serve recent advice without a Groq call.
+    Entries expire after ttl seconds.
+    """
+    def __init__(self, path="~/.cache/bush/advice.sqlite", ttl=1800):
+        self.ttl = ttl
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # check_same_thread=False: the background monitor calls in from a
+        # worker thread; WAL + NORMAL keeps writes cheap
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS advice "
+            "(hash TEXT PRIMARY KEY, prompt TEXT, advice TEXT, ts INTEGER)")
+        self._conn.commit()
+
+    def get(self, prompt_hash):
+        """
+        Returns the stored advice for the hash, or None if absent or expired.
+        """
+        row = self._conn.execute(
+            "SELECT advice FROM advice WHERE hash = ? AND ts > ?",
+            (prompt_hash, int(time.time()) - self.ttl)).fetchone()
+        return row[0] if row else None
+
+    def set(self, prompt_hash, prompt, advice):
+        """
+        Upserts advice for the hash, refreshing its timestamp.
+        """
+        self._conn.execute(
+            "INSERT INTO advice (hash, prompt, advice, ts) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(hash) DO UPDATE SET "
+            "prompt=excluded.prompt, advice=excluded.advice, ts=excluded.ts",
+            (prompt_hash, prompt, advice, int(time.time())))
+        self._conn.commit()
+
+
+_advice_store = None
+
+def _get_advice_store():
+    """
+    Lazily opens the shared AdviceStore; returns None when the cache
+    directory cannot be used (e.g. read-only filesystem).
+    """
+    global _advice_store
+    if _advice_store is None:
+        try:
+            _advice_store = AdviceStore()
+        except Exception as e:
+            print(f"Advice store unavailable: {e}")
+            _advice_store = False
+    return _advice_store or None
+
+def _build_messages(user_input, system_prompt):
+    """
+    Builds the messages list, with the static system prompt first so Groq can
+    cache the shared prefix.
+    """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": user_input})
+    return messages
+
+@functools.lru_cache(maxsize=256)
+def _cached_completion(api_key_id, model, prompt_hash, prompt, system_prompt):
+    """
+    Exact-match cached completion. Identical prompts (same model, same hash)
+    return the stored text without a network round-trip. Misses in this
+    in-memory cache fall through to the on-disk advice store before Groq,
+    so a restarted monitor can warm-start from previous runs.
+    """
+    store = _get_advice_store()
+    store_key = hashlib.sha256(
+        f"{model}\x00{system_prompt or ''}\x00{prompt}".encode()).hexdigest()
+    if store is not None:
+        advice = store.get(store_key)
+        if advice is not None:
+            return advice
+
+    client = _clients_by_key[api_key_id]
+    response_json = client.chat_completions(
+        messages=_build_messages(prompt, system_prompt), model=model, stream=False)
+    _log_usage(response_json)
+    content = _extract_content(response_json)
+
+    if store is not None:
+        try:
+            store.set(store_key, prompt, content)
+        except Exception as e:
+            print(f"Failed to persist advice: {e}")
+    return content
 
 # Function to send a query to the language model and extract content (for non-streaming)
-def get_ai_response_content(client, user_input, model="llama-3.3-70b-versatile", **kwargs):
+def get_ai_response_content(client, user_input, model="llama-3.3-70b-versatile", system_prompt=None, **kwargs):
     """
     Sends a query to the AI and returns the content of the response.
     Assumes non-streaming for this use case.
+    Calls with default options are served from an exact-match LRU cache.
     """
     if not user_input.strip():
         raise ValueError("Input is required")
 
-    messages = [{"role": "user", "content": user_input}]
-
     # Ensure stream is False for this function
     kwargs['stream'] = False
 
-    response_json = client.chat_completions(messages=messages, model=model, **kwargs)
+    if len(kwargs) == 1:
+        # Default options: safe to serve from the exact-match cache
+        _clients_by_key[client.api_key] = client
+        prompt_hash = hashlib.sha256(user_input.encode()).hexdigest()
+        return _cached_completion(client.api_key, model, prompt_hash, user_input, system_prompt)
+
+    response_json = client.chat_completions(
+        messages=_build_messages(user_input, system_prompt), model=model, **kwargs)
+    _log_usage(response_json)
+    return _extract_content(response_json)
+
+def get_ai_response_streamed(client, user_input, model="llama-3.3-70b-versatile", system_prompt=None):
+    """
+    Sends a query with stream=True, printing tokens as they arrive and
+    returning the assembled text. The first words show up at
+    first-token time instead of after the whole completion has been decoded
+    and downloaded.
+    """
+    if not user_input.strip():
+        raise ValueError("Input is required")
+
+    lines = client.chat_completions(
+        messages=_build_messages(user_input, system_prompt), model=model, stream=True)
+
+    chunks = []
+    for line in lines:
+        # SSE frames look like "data: {...}"; the stream ends with [DONE]
+        if not line or not line.startswith("data: "):
+            continue
+        payload = line[len("data: "):]
+        if payload == "[DONE]":
+            break
+        try:
+            event = orjson.loads(payload) if orjson is not None else json.loads(payload)
+        except ValueError:
+            continue
+        delta = event.get("choices", [{}])[0].get("delta", {}).get("content")
+        if delta:
+            chunks.append(delta)
+            print(delta, end="", flush=True)
+    print()
+    return "".join(chunks)
+
+# Schema described once per prompt so the JSON payload can stay compact,
+# without repeating field names as prose labels for every process
+_SNAPSHOT_SCHEMA = ('Schema: {"system": {metric: value}, "top_processes": '
+                    '[{"pid", "name", "user", "cpu" (percent), "mem" (percent), "cmd"}]}\n'
+                    'Data:\n')
+_WINDOW_SCHEMA = ('Schema: {"snapshots" (oldest first): [{"t" (seconds before the '
+                  'latest snapshot), "cpu" (percent), '
+                  '"mem" (percent), "disk" (percent)}], "top_processes" (peak CPU '
+                  'across the window): [{"pid", "name", "user", "cpu" (percent), "cmd"}]}\n'
+                  'Data:\n')
+
+
+def _json_dumps(obj):
+    """
+    Compact JSON encoding, via orjson when available.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _proc_payload(p, with_mem=True):
+    """
+    Compact per-process dict for the prompt payload, cmdline capped at 100
+    characters.
+    """
+    payload = {
+        "pid": p.get('pid'),
+        "name": p.get('name'),
+        "user": p.get('username'),
+        "cpu": round(p.get('cpu_percent') or 0, 2),
+        "cmd": (p.get('cmdline') or '')[:100],
+    }
+    if with_mem:
+        payload["mem"] = round(p.get('memory_percent') or 0, 2)
+    return payload
 
-    try:
-        # Extract the content from the non-streaming JSON response
-        return response_json["choices"][0]["message"]["content"]
-    except (KeyError, IndexError):
-        # Print the unexpected response structure for debugging
-        print("Unexpected response structure from Groq API:")
-        print(json.dumps(response_json, indent=2))
-        raise Exception("Malformed response from Groq API")
 
 def analyze_system_data(client, system_info, processes):
     """
     Analyzes system monitoring data using the AI and provides advice.
+    Near-duplicate snapshots are served from the semantic cache without
+    contacting the AI.
     """
+    # Check the semantic cache first: if the system state is essentially
+    # unchanged since a recent analysis, reuse that advice
+    emb = None
+    if _semantic_cache.available:
+        emb = _semantic_cache.embed(_snapshot_features(system_info, processes))
+        cached_advice = _semantic_cache.get(emb, threshold=0.92)
+        if cached_advice is not None:
+            print("\n--- AI Analysis and Advice (cached) ---")
+            print(cached_advice)
+            print("--- End of AI Analysis ---")
+            return
+
     print("Sending data to AI for analysis...")
-    prompt = "Analyze the following system data and provide concise advice on potential congestion, overload, or malicious activity.\n\n"
+    # The analysis instructions live in _SYSTEM_PROMPT; the user message is a
+    # compact JSON payload with the schema stated once, so field names are not
+    # repeated as prose labels for each of the 20 processes.
+    # Skip volatile byte counters (they change on every tick and would defeat
+    # the exact-match cache) and round floats so near-identical snapshots
+    # produce identical prompts.
+    info = {key: (round(value, 1) if isinstance(value, float) else value)
+            for key, value in system_info.items()
+            if key not in ("bytes_sent", "bytes_received")}
 
-    prompt += "System Information:\n"
-    for key, value in system_info.items():
-        # Format float values for better readability in the prompt
-        if isinstance(value, float):
-             prompt += f"- {key}: {value:.2f}\n"
-        else:
-            prompt += f"- {key}: {value}\n"
+    # Limit the number of processes sent to the AI to avoid exceeding token
+    # limits; nlargest is O(N log K) vs O(N log N) for a full sort
+    processes_for_prompt = heapq.nlargest(20, processes, key=lambda p: p.get('cpu_percent') or 0)
+
+    payload = {"system": info,
+               "top_processes": [_proc_payload(p) for p in processes_for_prompt]}
+    prompt = _SNAPSHOT_SCHEMA + _json_dumps(payload)
 
-    prompt += "\nRunning Processes:\n"
-    if processes:
-        # Limit the number of processes sent to the AI to avoid exceeding token limits
+    try:
+        if sys.stdout.isatty():
+            # Interactive: stream tokens as they arrive for a fast first word
+            print("\n--- AI Analysis and Advice ---")
+            advice = get_ai_response_streamed(client, prompt, system_prompt=_SYSTEM_PROMPT)
+            print("--- End of AI Analysis ---")
+        else:
+            # Daemon/log capture: keep the non-streaming, cacheable path
+            advice = get_ai_response_content(client, prompt, system_prompt=_SYSTEM_PROMPT)
+            print("\n--- AI Analysis and Advice ---")
+            print(advice)
+            print("--- End of AI Analysis ---")
+        _semantic_cache.set(emb, advice)
+    except Exception as e:
+        print(f"Error during AI analysis: {e}")
 
-        #  take the top N or filter for high resource users
-        processes_for_prompt = sorted(processes, key=lambda p: p.get('cpu_percent', 0), reverse=True)[:20] # Example: top 20 by CPU
+def analyze_system_window(client, snapshots):
+    """
+    Analyzes a window of system snapshots in a single AI call.
+    snapshots is an iterable of (timestamp, system_info, top_procs) tuples,
+    oldest first; one call covers the whole window instead of one call per
+    snapshot, and the model sees the trend across ticks.
+    """
+    snapshots = list(snapshots)
+    if not snapshots:
+        return
 
-        for p in processes_for_prompt:
-            # Basic sanitization/formatting for command line to avoid prompt issues
-            cmdline_display = p.get('cmdline', 'N/A')
-            if len(cmdline_display) > 100: # Truncate long command lines
-                cmdline_display = cmdline_display[:97] + "..."
-            cmdline_display = cmdline_display.replace('\n', ' ').replace('\r', '') # Remove newlines
+    # Merge the per-snapshot top processes, keeping each PID's peak CPU reading
+    merged = {}
+    for _, _, top_procs in snapshots:
+        for p in top_procs:
+            pid = p.get('pid')
+            current = merged.get(pid)
+            if current is None or (p.get('cpu_percent') or 0) > (current.get('cpu_percent') or 0):
+                merged[pid] = p
+    window_procs = heapq.nlargest(20, merged.values(), key=lambda p: p.get('cpu_percent') or 0)
 
-            mem_percent = p.get('memory_percent')
-            mem_display = f"{mem_percent:.2f}%" if isinstance(mem_percent, float) else "N/A"
+    latest_info = snapshots[-1][1]
 
-            prompt += f"- PID: {p.get('pid', 'N/A')}, Name: {p.get('name', 'N/A')}, User: {p.get('username', 'N/A')}, CPU: {p.get('cpu_percent', 0):.2f}%, Memory: {mem_display}, Cmdline: {cmdline_display}\n"
-    else:
-        prompt += "No process data available.\n"
+    # Check the semantic cache against the most recent system state
+    emb = None
+    if _semantic_cache.available:
+        emb = _semantic_cache.embed(_snapshot_features(latest_info, window_procs))
+        cached_advice = _semantic_cache.get(emb, threshold=0.92)
+        if cached_advice is not None:
+            print("\n--- AI Analysis and Advice (cached) ---")
+            print(cached_advice)
+            print("--- End of AI Analysis ---")
+            return
 
-    prompt += "\nBased on this data, identify any potential issues (high resource usage, unusual processes, potential malicious indicators) and provide concise, actionable advice. If everything looks normal, state that."
+    print(f"Sending window of {len(snapshots)} snapshots to AI for analysis...")
+    # Instructions live in _SYSTEM_PROMPT; the user message is a compact JSON
+    # payload with the schema stated once. Snapshot times are offsets from
+    # the latest snapshot, not wall-clock stamps: an absolute time would make
+    # every prompt byte-unique and defeat the exact-match and on-disk caches.
+    latest_ts = snapshots[-1][0]
+    payload = {
+        "snapshots": [
+            {"t": round(latest_ts - timestamp),
+             "cpu": round(info.get('cpu_percent') or 0, 1),
+             "mem": round(info.get('memory_percent') or 0, 1),
+             "disk": round(info.get('disk_percent') or 0, 1)}
+            for timestamp, info, _ in snapshots
+        ],
+        "top_processes": [_proc_payload(p, with_mem=False) for p in window_procs],
+    }
+    prompt = _WINDOW_SCHEMA + _json_dumps(payload)
 
     try:
-        # Use the new function that handles content extraction
-        advice = get_ai_response_content(client, prompt)
-        print("\n--- AI Analysis and Advice ---")
-        print(advice)
-        print("--- End of AI Analysis ---")
+        if sys.stdout.isatty():
+            # Interactive: stream tokens as they arrive for a fast first word
+            print("\n--- AI Analysis and Advice ---")
+            advice = get_ai_response_streamed(client, prompt, system_prompt=_SYSTEM_PROMPT)
+            print("--- End of AI Analysis ---")
+        else:
+            # Daemon/log capture: keep the non-streaming, cacheable path
+            advice = get_ai_response_content(client, prompt, system_prompt=_SYSTEM_PROMPT)
+            print("\n--- AI Analysis and Advice ---")
+            print(advice)
+            print("--- End of AI Analysis ---")
+        _semantic_cache.set(emb, advice)
     except Exception as e:
         print(f"Error during AI analysis: {e}")
 
@@ -164,17 +610,24 @@ if __name__ == "__main__":
             "bytes_sent": psutil.net_io_counters().bytes_sent,
             "bytes_received": psutil.net_io_counters().bytes_recv,
         }
-        test_processes = []
-        # Collect a sample of processes, maybe filter for high resource users
-        all_processes = []
+        # Stream processes through a bounded heap keeping only the 50 hottest
+        # by CPU, so peak memory is O(K) instead of one dict per PID on the
+        # host. The counter breaks ties so dicts never reach the comparison.
+        top = []
+        tiebreak = itertools.count()
         for p in psutil.process_iter(['pid', 'name', 'username', 'cmdline', 'cpu_percent', 'memory_info']):
             try:
-                all_processes.append(p.info)
+                info = p.info
+                entry = (info.get('cpu_percent') or 0, next(tiebreak), info)
+                if len(top) < 50:
+                    heapq.heappush(top, entry)
+                else:
+                    heapq.heappushpop(top, entry)
             except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
                 continue
 
-        # Sort by CPU and take top N for a more relevant sample for the AI
-        test_processes = sorted(all_processes, key=lambda p: p.get('cpu_percent', 0), reverse=True)[:50]
+        # Highest CPU first for a more relevant sample for the AI
+        test_processes = [entry[2] for entry in sorted(top, reverse=True)]
 
         analyze_system_data(groq_client, test_system_info, test_processes)
 
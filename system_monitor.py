@@ -1,9 +1,13 @@
 # system_monitor.py
 import psutil
 import argparse
+import collections
+import functools
+import heapq
 import time
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Import the aimonitor script
 
@@ -15,13 +19,36 @@ except ImportError:
     sys.exit(1)
 
 
-def get_system_info():
+# Total physical memory never changes; read /proc/meminfo once at import
+_TOTAL_MEM = psutil.virtual_memory().total
+
+# Prime the system-wide CPU counter so the first non-blocking cpu_percent
+# call returns a real delta instead of 0.0
+psutil.cpu_percent(None)
+
+
+@functools.lru_cache(maxsize=1)
+def _vm_snapshot(bucket):
+    """
+    Memoized virtual_memory() snapshot. bucket is the current monotonic
+    second, so all callers within the same second share one /proc/meminfo
+    read and parse.
+    """
+    return psutil.virtual_memory()
+
+
+def get_system_info(cpu_interval=None):
     """
     Gathering basic system information.
+     cpu_interval: Blocking CPU sampling interval in seconds; None (the
+     default) returns usage since the previous call without blocking.
     """
     try:
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory_info = psutil.virtual_memory()
+        # Non-blocking by default: the background loop's own tick cadence is
+        # the sampling window, so nothing stalls for a full second. One-shot
+        # callers pass a short cpu_interval to get a measured sample instead.
+        cpu_percent = psutil.cpu_percent(interval=cpu_interval)
+        memory_info = _vm_snapshot(int(time.monotonic()))
         disk_usage = psutil.disk_usage('/')
         net_io = psutil.net_io_counters()
 
@@ -38,53 +65,211 @@ def get_system_info():
         return {}
 
 
-def list_processes(procname=None, cmdline=None):
+class ProcessSnapshotter:
+    """
+    Caches one pass over psutil.process_iter for a short TTL so consumers
+    that each need a view of the process table (list_processes,
+    get_top_cpu_processes, get_memory_range_processes) within the same tick
+    share a single /proc walk instead of repeating it.
+    """
+    # Union of the attributes every consumer needs
+    _ATTRS = ['pid', 'name', 'username', 'cmdline', 'cpu_percent', 'cpu_times', 'memory_info']
+
+    def __init__(self, ttl=0.5):
+        self.ttl = ttl
+        self._snap = None
+        self._ts = 0.0
+
+    def get(self):
+        """
+        Returns the cached snapshot, refreshing it when older than ttl.
+        The returned dicts are shared; consumers must copy before mutating.
+        """
+        now = time.monotonic()
+        if self._snap is None or now - self._ts >= self.ttl:
+            self._snap = [p.info for p in psutil.process_iter(self._ATTRS)]
+            self._ts = now
+        return self._snap
+
+
+_SNAPSHOTTER = ProcessSnapshotter()
+
+
+def list_processes(procname=None, cmdline=None, snapshot=None):
     """
     Lists processes with optional filtering by name or command line.
+    snapshot: Optional pre-collected ProcessSnapshotter snapshot to reuse.
     -Return a list of process dictionaries.
     """
+    if snapshot is None:
+        snapshot = _SNAPSHOTTER.get()
+
     processes = []
-    # Specify attributes we are interested in to potentially speed up
-    attrs = ['pid', 'name', 'username', 'cmdline', 'cpu_percent', 'memory_info']
-    for p in psutil.process_iter(attrs):
+    for info in snapshot:
         try:
-            pinfo = p.info
-            if procname and procname.lower() not in pinfo.get('name', '').lower():
+            if procname and procname.lower() not in (info.get('name') or '').lower():
                 continue
             # Ensure cmdline is not None before joining and searching
-            process_cmdline = " ".join(pinfo.get('cmdline', []) or [])
+            process_cmdline = " ".join(info.get('cmdline') or [])
             if cmdline and cmdline.lower() not in process_cmdline.lower():
                 continue
 
+            # Copy before augmenting: the snapshot dicts are shared across
+            # consumers. memory_info has no .percent attribute, so derive the
+            # percentage from RSS and total physical memory
+            pinfo = info.copy()
+            rss = getattr(pinfo.pop('memory_info', None), 'rss', 0) or 0
+            pinfo.pop('cpu_times', None)
+            pinfo['cmdline'] = process_cmdline
+            pinfo['rss'] = rss  # RSS for memory-based checks
+            pinfo['memory_percent'] = rss / _TOTAL_MEM * 100 if _TOTAL_MEM else None
+            processes.append(pinfo)
+        except Exception as e:
+            print(f"Error processing process {info.get('pid', 'N/A')}: {e}")
+            continue
+
+    return processes
+
+
+# Constants for the Linux /proc fast path
+if sys.platform == 'linux':
+    _CLK_TCK = os.sysconf('SC_CLK_TCK')
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+    import pwd
+
+# Previous (cpu ticks, timestamp) per PID, for delta-based CPU percentages
+_last_cpu_times = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _username_for_uid(uid):
+    """
+    Resolves a UID to a username, falling back to the numeric UID.
+    """
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+
+def _fast_proc_scan():
+    """
+    Linux fast path for process scanning: reads /proc/<pid>/stat and cmdline
+    with one os.read each instead of going through psutil's per-attribute
+    wrappers. CPU percentages are deltas against the previous scan.
+    -Return a list of process dicts in the same shape as list_processes.
+    """
+    now = time.monotonic()
+    processes = []
+    new_times = {}
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        pid = int(entry.name)
+        try:
+            fd = os.open(entry.path + "/stat", os.O_RDONLY)
+            try:
+                stat = os.read(fd, 1024)
+            finally:
+                os.close(fd)
+            # comm is parenthesized and may contain spaces; the remaining
+            # fields sit at fixed offsets after the closing paren (man 5 proc)
+            rparen = stat.rindex(b')')
+            name = stat[stat.index(b'(') + 1:rparen].decode('utf-8', 'replace')
+            fields = stat[rparen + 2:].split()
+            utime, stime = int(fields[11]), int(fields[12])  # fields 14/15
+            starttime = int(fields[19])                      # field 22
+            rss = int(fields[21]) * _PAGE_SIZE               # field 24, in pages
+
+            # Key the delta on (pid, starttime): a recycled PID is a different
+            # process, and diffing against the old owner's ticks could go
+            # negative. A starttime mismatch counts as no previous sample.
+            total_ticks = utime + stime
+            new_times[pid] = (starttime, total_ticks, now)
+            prev = _last_cpu_times.get(pid)
+            if prev and prev[0] == starttime and now > prev[2]:
+                cpu_percent = max(0.0, (total_ticks - prev[1]) / _CLK_TCK / (now - prev[2]) * 100)
+            else:
+                cpu_percent = 0.0
+
+            try:
+                fd = os.open(entry.path + "/cmdline", os.O_RDONLY)
+                try:
+                    raw = os.read(fd, 4096)
+                finally:
+                    os.close(fd)
+                cmdline = raw.rstrip(b'\x00').replace(b'\x00', b' ').decode('utf-8', 'replace')
+            except OSError:
+                cmdline = ""
+
             processes.append({
-                "pid": pinfo.get('pid'),
-                "name": pinfo.get('name'),
-                "username": pinfo.get('username'),
-                "cmdline": process_cmdline,
-                "cpu_percent": pinfo.get('cpu_percent'),
-                "memory_percent": getattr(pinfo.get('memory_info'), 'percent', None),
-                "rss": getattr(pinfo.get('memory_info'), 'rss', 0)  # Add RSS for memory-based checks
+                "pid": pid,
+                "name": name,
+                "username": _username_for_uid(entry.stat().st_uid),
+                "cmdline": cmdline,
+                "cpu_percent": cpu_percent,
+                "memory_percent": rss / _TOTAL_MEM * 100 if _TOTAL_MEM else None,
+                "rss": rss
             })
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
-            # Ignore processes that vanish or deny access during iteration
+        except (OSError, ValueError, IndexError):
+            # Process vanished mid-scan or the stat line failed to parse
             continue
+
+    _last_cpu_times.clear()
+    _last_cpu_times.update(new_times)
+    return processes
+
+
+def collect_snapshot(top_k=20):
+    """
+    Collects the full process list plus aggregate counters in a single pass
+    over psutil.process_iter, instead of walking every PID once per consumer.
+    On Linux a direct /proc scan replaces psutil entirely.
+    -Return (processes, total_rss, top_cpu) where total_rss is the summed RSS
+    in bytes and top_cpu holds the top_k processes by CPU usage.
+    """
+    if sys.platform == 'linux':
+        try:
+            processes = _fast_proc_scan()
+            total_rss = sum(p['rss'] for p in processes)
+            top_cpu = heapq.nlargest(top_k, processes, key=lambda p: p.get('cpu_percent') or 0)
+            return processes, total_rss, top_cpu
+        except Exception as e:
+            print(f"Fast /proc scan failed, falling back to psutil: {e}")
+
+    processes = []
+    total_rss = 0
+    for info in _SNAPSHOTTER.get():
+        try:
+            # Copy before augmenting: the snapshot dicts are shared
+            pinfo = info.copy()
+            rss = getattr(pinfo.pop('memory_info', None), 'rss', 0) or 0
+            total_rss += rss
+            pinfo.pop('cpu_times', None)
+            pinfo['cmdline'] = " ".join(pinfo.get('cmdline') or [])
+            pinfo['rss'] = rss
+            pinfo['memory_percent'] = rss / _TOTAL_MEM * 100 if _TOTAL_MEM else None
+            processes.append(pinfo)
         except Exception as e:
-            print(f"Error processing process {pinfo.get('pid', 'N/A')}: {e}")
+            print(f"Error processing process {info.get('pid', 'N/A')}: {e}")
             continue
 
-    return processes
+    top_cpu = heapq.nlargest(top_k, processes, key=lambda p: p.get('cpu_percent') or 0)
+    return processes, total_rss, top_cpu
 
 
-def get_top_cpu_processes(limit=3):
+def get_top_cpu_processes(limit=3, snapshot=None):
     """
     Returns a list of processes consuming the most CPU time.
     :param limit: The number of top processes to return.
+    :param snapshot: Optional pre-collected ProcessSnapshotter snapshot to reuse.
     """
+    if snapshot is None:
+        snapshot = _SNAPSHOTTER.get()
+
     processes_with_cpu_times = []
-    # Need to fetch cpu_times for sorting
-    for p in psutil.process_iter(['pid', 'name', 'cpu_times', 'username']):
+    for pinfo in snapshot:
         try:
-            pinfo = p.info
             cpu_times = pinfo.get('cpu_times')
             if cpu_times:
                 total_cpu_time = sum(cpu_times[:2])  # Sum user and system time
@@ -94,31 +279,30 @@ def get_top_cpu_processes(limit=3):
                     "username": pinfo.get('username'),
                     "total_cpu_time": total_cpu_time
                 })
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
-            continue
         except Exception as e:
             print(f"Error getting CPU times for process {pinfo.get('pid', 'N/A')}: {e}")
             continue
 
-    # Sort by total_cpu_time in descending order
-    sorted_processes = sorted(processes_with_cpu_times, key=lambda x: x.get('total_cpu_time', 0), reverse=True)
-    return sorted_processes[:limit]
+    # Partial sort: only the top `limit` entries are needed
+    return heapq.nlargest(limit, processes_with_cpu_times, key=lambda x: x.get('total_cpu_time') or 0)
 
 
-def get_memory_range_processes(min_mb, max_mb):
+def get_memory_range_processes(min_mb, max_mb, snapshot=None):
     """
     Returns a list of processes consuming memory within the specified range (in MB).
     :param min_mb: Minimum memory usage in MB.
     :param max_mb: Maximum memory usage in MB.
+    :param snapshot: Optional pre-collected ProcessSnapshotter snapshot to reuse.
     """
     min_bytes = min_mb * 1024 * 1024
     max_bytes = max_mb * 1024 * 1024
 
+    if snapshot is None:
+        snapshot = _SNAPSHOTTER.get()
+
     matching_processes = []
-    # Need to fetch memory_info for RSS
-    for p in psutil.process_iter(['pid', 'name', 'username', 'memory_info']):
+    for pinfo in snapshot:
         try:
-            pinfo = p.info
             mem_info = pinfo.get('memory_info')
             if mem_info and mem_info.rss:
                 rss_bytes = mem_info.rss
@@ -129,8 +313,6 @@ def get_memory_range_processes(min_mb, max_mb):
                         "username": pinfo.get('username'),
                         "rss_mb": rss_bytes / (1024 * 1024)
                     })
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
-            continue
         except Exception as e:
             print(f"Error getting memory info for process {pinfo.get('pid', 'N/A')}: {e}")
             continue
@@ -139,14 +321,61 @@ def get_memory_range_processes(min_mb, max_mb):
     return sorted(matching_processes, key=lambda x: x.get('rss_mb', 0), reverse=True)
 
 
-def run_background_monitor(interval=60, ai_check_interval=300):
+def _snapshot_fingerprint(system_info, top_cpu):
+    """
+    Cheap fingerprint of a snapshot for change detection: CPU and memory
+    bucketed to 5%, disk to 1%, plus the set of top-process PIDs.
+    """
+    return (
+        round((system_info.get('cpu_percent') or 0) / 5) * 5,
+        round((system_info.get('memory_percent') or 0) / 5) * 5,
+        round(system_info.get('disk_percent') or 0),
+        frozenset(p.get('pid') for p in top_cpu),
+    )
+
+
+def run_background_monitor(interval=60, ai_check_interval=300, window=6, max_skip=6):
     """
     Run the system monitor in the background, periodically sending data to AI.
      interval: Interval in seconds to collect system data.
      ai_check_interval: Interval in seconds to send data to AI for analysis.
+     window: Number of recent snapshots batched into each AI call.
+     max_skip: Maximum consecutive AI calls skipped when nothing changed.
     """
     print("Running system monitor in background...")
-    last_ai_check_time = time.time()
+
+    # Prime the per-process CPU counters once so the first metered scan
+    # reports meaningful delta-based percentages instead of 0.0. On Linux the
+    # hot path is _fast_proc_scan, which keeps its own delta state, so run it
+    # once and discard the result; the psutil loop covers the fallback
+    # platforms (process_iter caches Process handles internally, so each
+    # later scan reuses the same objects and counters).
+    primed = False
+    if sys.platform == 'linux':
+        try:
+            _fast_proc_scan()
+            primed = True
+        except Exception:
+            pass
+    if not primed:
+        for p in psutil.process_iter():
+            try:
+                p.cpu_percent(None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
+                continue
+
+    # Ring buffer of recent snapshots; one AI call covers the whole window
+    snapshots = collections.deque(maxlen=window)
+
+    # Single-worker executor so a slow Groq response never stalls collection;
+    # one worker also guarantees AI calls never overlap each other
+    ai_executor = ThreadPoolExecutor(max_workers=1)
+    ai_future = None
+
+    # Change detector: skip AI calls while the fingerprint is unchanged, but
+    # force a heartbeat analysis after max_skip consecutive skips
+    last_fingerprint = None
+    skipped = 0
 
     # Initialize AI client once
     groq_api_key = os.environ.get("GROQ_API_KEY")
@@ -163,31 +392,59 @@ def run_background_monitor(interval=60, ai_check_interval=300):
             print("AI analysis will be skipped.")
             ai_client = None
 
+    # Monotonic deadlines: sleeping until the next deadline (rather than for a
+    # fixed interval after work) keeps the cadence from drifting by however
+    # long collection and the AI hand-off took
+    next_collect = time.monotonic()
+    next_ai = time.monotonic() + ai_check_interval
+
     try:
         while True:
-            current_time = time.time()
-
-            # Collect data
+            # Collect data in a single pass over all processes; only the
+            # aggregates and the top-CPU slice are consumed here
             system_info = get_system_info()
-            processes = list_processes()  # Get all processes for AI analysis
+            _, total_rss, top_cpu = collect_snapshot()
+            snapshots.append((time.time(), system_info, top_cpu))
 
             print(
-                f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Collected system data. CPU: {system_info.get('cpu_percent', 'N/A')}%")
-
-            # Send data to AI periodically
-            if ai_client and (current_time - last_ai_check_time) >= ai_check_interval:
-                print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Sending data to AI...")
-                # Pass collected data to the AI monitor function
-                aimon.analyze_system_data(ai_client, system_info, processes)
-                last_ai_check_time = current_time
-
-            # Wait for the next interval
-            time.sleep(interval)
+                f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Collected system data. "
+                f"CPU: {system_info.get('cpu_percent', 'N/A')}%, "
+                f"Total RSS: {total_rss / (1024 * 1024):.0f}MB")
+
+            # Surface any exception from the previous AI call
+            if ai_future is not None and ai_future.done():
+                try:
+                    ai_future.result()
+                except Exception as e:
+                    print(f"Error during AI analysis: {e}")
+                ai_future = None
+
+            # Send the buffered window to AI periodically in one batched call,
+            # offloaded to the executor so collection keeps its cadence
+            if ai_client and time.monotonic() >= next_ai and ai_future is None:
+                fingerprint = _snapshot_fingerprint(system_info, top_cpu)
+                if fingerprint == last_fingerprint and skipped < max_skip:
+                    skipped += 1
+                    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] "
+                          f"No significant change, skipping AI call ({skipped}/{max_skip}).")
+                else:
+                    skipped = 0
+                    last_fingerprint = fingerprint
+                    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Sending data to AI...")
+                    ai_future = ai_executor.submit(
+                        aimon.analyze_system_window, ai_client, list(snapshots))
+                next_ai = time.monotonic() + ai_check_interval
+
+            # Sleep until the next collection deadline
+            next_collect += interval
+            time.sleep(max(0, next_collect - time.monotonic()))
 
     except KeyboardInterrupt:
         print("\nBackground monitoring stopped by user.")
     except Exception as e:
         print(f"\nAn unexpected error occurred during background monitoring: {e}")
+    finally:
+        ai_executor.shutdown(wait=False)
 
 
 def main():
@@ -217,7 +474,9 @@ def main():
 
     # Existing command line functionalities
     if args.system:
-        system_info = get_system_info()
+        # One-shot query: take a short measured sample, since the delta since
+        # module import a few milliseconds ago would be meaningless
+        system_info = get_system_info(cpu_interval=0.2)
         print("--- System Information ---")
         print(f"CPU Usage: {system_info.get('cpu_percent', 'N/A')}%")
         print(f"Memory Usage: {system_info.get('memory_percent', 'N/A')}%")